@@ -10,6 +10,7 @@ except PackageNotFoundError:
 __author__ = "Eva Maxfield Brown"
 __email__ = "evamaxfieldbrown@gmail.com"
 
+from ._cache import DEFAULT_CACHE_PATH
 from .main import (
     DirectoryExtractionResult,
     Extractor,
@@ -18,6 +19,7 @@ from .main import (
 )
 
 __all__ = [
+    "DEFAULT_CACHE_PATH",
     "DirectoryExtractionResult",
     "Extractor",
     "ExtractorType",
@@ -0,0 +1,80 @@
+"""Persistent on-disk cache of raw import extractions."""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+# Kept unexpanded so importing the package never needs a home directory; "~" is
+# resolved when a cache is actually opened
+DEFAULT_CACHE_PATH = Path("~/.cache/eil/ast.sqlite")
+
+# Bump whenever the extraction logic changes in a way that would make
+# previously cached results stale. Mismatched caches are dropped on open.
+CACHE_SCHEMA_VERSION = 1
+
+###############################################################################
+
+
+class ImportCache:
+    """SQLite-backed cache keyed by (language, SHA-256 of source bytes).
+
+    Only the raw, uncategorized extraction is stored (the imported names and
+    the names found in first-party constructs such as relative imports), so a
+    cached entry stays valid regardless of the repository it is later
+    categorized against.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_CACHE_PATH) -> None:
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # The connection is shared by every thread using the owning Extractor
+        self._lock = threading.Lock()
+
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        with self._conn:
+            if version != CACHE_SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS imports")
+                self._conn.execute(f"PRAGMA user_version = {CACHE_SCHEMA_VERSION}")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS imports (
+                    hash BLOB NOT NULL,
+                    lang TEXT NOT NULL,
+                    imported TEXT NOT NULL,
+                    first_party TEXT NOT NULL,
+                    PRIMARY KEY (hash, lang)
+                )
+                """
+            )
+
+    def get(self, lang: str, digest: bytes) -> tuple[set[str], set[str]] | None:
+        """Return the cached (imported, first_party) names or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT imported, first_party FROM imports WHERE hash = ? AND lang = ?",
+                (digest, lang),
+            ).fetchone()
+        if row is None:
+            return None
+        return set(json.loads(row[0])), set(json.loads(row[1]))
+
+    def put(
+        self,
+        lang: str,
+        digest: bytes,
+        imported: set[str],
+        first_party: set[str],
+    ) -> None:
+        """Store the raw extraction for a piece of source code."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?)",
+                (digest, lang, json.dumps(sorted(imported)), json.dumps(sorted(first_party))),
+            )
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,6 +1,9 @@
 """Supporting data for eil package."""
 
+from collections.abc import Mapping
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 
 from stdlib_list import long_versions, stdlib_list
 from yaml import safe_load
@@ -11,8 +14,13 @@ STDLIBS_FILE = DATA_DIR / "stdlibs.yml"
 ###############################################################################
 
 
-def load_stdlibs() -> dict[str, set[str]]:
-    """Load standard library data from YAML file."""
+@lru_cache(maxsize=1)
+def load_stdlibs() -> Mapping[str, frozenset[str]]:
+    """Load standard library data from YAML file.
+
+    The result is computed once per process and shared, so it is returned as a
+    read-only mapping of frozen per-language sets that callers cannot mutate.
+    """
     with open(STDLIBS_FILE, encoding="utf-8") as f:
         stdlib_data: dict[str, list[str]] = safe_load(f)
 
@@ -24,4 +32,6 @@ def load_stdlibs() -> dict[str, set[str]]:
     for version in long_versions:
         stdlib_data_as_set["python"].update(stdlib_list(version))
 
-    return stdlib_data_as_set
+    return MappingProxyType(
+        {lang: frozenset(libs) for lang, libs in stdlib_data_as_set.items()}
+    )
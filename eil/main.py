@@ -1,18 +1,32 @@
 #!/usr/bin/env python
 
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
 import re
+import threading
 import traceback
-from collections.abc import Callable
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.util import Finalize
 from pathlib import Path
-from typing import Self
+from types import MappingProxyType
+from typing import ClassVar, Self
 
 from tqdm import tqdm
 from tree_sitter import Language, Parser, Query, QueryCursor
 from tree_sitter_language_pack import SupportedLanguage, get_language
 
+from ._cache import ImportCache
 from .data import load_stdlibs
+from .queries import load_query_source
 
 ###############################################################################
 
@@ -45,6 +59,20 @@ class DirectoryExtractionResult:
 ###############################################################################
 
 
+# Byte substrings at least one of which must appear in any source containing
+# an import the corresponding query could capture. Plain `in` checks run as a
+# C-level memory search, several times faster than a regex scan.
+_PREFILTER_TOKENS: dict[str, tuple[bytes, ...]] = {
+    "python": (b"import",),
+    "r": (b"library", b"require", b"source", b"::"),
+}
+
+# Number of (language, content hash) extractions kept in memory per Extractor
+_CONTENT_CACHE_MAXSIZE = 1024
+
+# Number of (path, mtime, size) extractions kept in memory per Extractor
+_FILE_CACHE_MAXSIZE = 4096
+
 DEFAULT_IGNORED_DIRS = frozenset(
     {
         "external",
@@ -95,14 +123,93 @@ def _filter_names(names: set[str], lang: str | None, category: str = "third") ->
     return {n for n in names if fn(n)}
 
 
-def _is_descendant(node, ancestor) -> bool:
-    """Check if node is a descendant of ancestor in the AST."""
+# Language grammars and compiled queries are immutable once built, so they are
+# shared by every Extractor in the process. Growth is bounded by the shipped
+# query files (eil/queries/*.scm).
+_LANG_CACHE: dict[str, Language] = {}
+_QUERY_CACHE: dict[str, Query] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _load_shared_language(lang: SupportedLanguage) -> tuple[Language, Query]:
+    """Return the process-wide grammar and compiled import query for a language."""
+    with _CACHE_LOCK:
+        if lang not in _QUERY_CACHE:
+            language = get_language(lang)
+            _QUERY_CACHE[lang] = Query(language, load_query_source(lang))
+            _LANG_CACHE[lang] = language
+        return _LANG_CACHE[lang], _QUERY_CACHE[lang]
+
+
+def _record_extraction(
+    result: DirectoryExtractionResult,
+    path: Path,
+    libs: ImportedLibraries | None,
+    error: str | None,
+) -> None:
+    """Store a single file's extraction outcome on a result."""
+    if libs is not None:
+        result.extracted[path] = libs
+    else:
+        result.failed[path] = error or ""
+
+
+def _evict_lru(cache: OrderedDict, maxsize: int) -> None:
+    """Drop least recently used entries until the cache holds at most `maxsize`."""
+    while len(cache) > maxsize:
+        cache.popitem(last=False)
+
+
+def _enclosing_call(node):
+    """Return the nearest ancestor `call` node, if any."""
     cur = node.parent
-    while cur:
-        if cur == ancestor:
-            return True
+    while cur and cur.type != "call":
         cur = cur.parent
-    return False
+    return cur
+
+
+def _sorted_nodes_between(
+    nodes: list, start_idx: int, after_byte: int, before_byte: int
+) -> tuple[int, int]:
+    """Return the [start, end) index range of nodes between two byte offsets.
+
+    `nodes` must be sorted by start byte. The search begins at `start_idx`,
+    which lets callers walking offsets in order advance a single pointer.
+    """
+    while start_idx < len(nodes) and nodes[start_idx].start_byte <= after_byte:
+        start_idx += 1
+    end_idx = start_idx
+    while end_idx < len(nodes) and nodes[end_idx].start_byte < before_byte:
+        end_idx += 1
+    return start_idx, end_idx
+
+
+def _node_text(source: bytes, node) -> str:
+    """Return the text of a node from the UTF-8 source it was parsed from."""
+    # Node offsets are byte offsets, so slice the encoded source rather than
+    # the decoded string (which would be wrong for any non-ASCII content).
+    return source[node.start_byte : node.end_byte].decode("utf-8")
+
+
+def _unquoted_node_text(source: bytes, node) -> str:
+    """Return a node's text, without the surrounding quotes for string literals."""
+    # String literal nodes always start and end with their quote character,
+    # so slice inside them instead of stripping the decoded text
+    if node.type == "string":
+        return source[node.start_byte + 1 : node.end_byte - 1].decode("utf-8")
+    return _node_text(source, node)
+
+
+def _path_stem(path: str) -> str:
+    """Return the final component of a "/"-separated path without its suffix.
+
+    Matches `Path(path).stem` for the relative paths seen in source() calls
+    without building a Path object for each one.
+    """
+    # Like pathlib, ignore empty and "." segments, so "foo/." names "foo"
+    name = next((part for part in reversed(path.split("/")) if part not in ("", ".")), "")
+    stem, _, suffix = name.rpartition(".")
+    return stem if stem and suffix else name
 
 
 def _collect_files_to_extract(
@@ -248,7 +355,14 @@ def _collect_repository_modules(
 
 
 class Extractor:
-    SUPPORTED_LANGUAGES = (
+    """Extract and categorize the libraries imported by source files.
+
+    A single Extractor may be shared between threads: each thread parses with
+    its own parsers and query cursors, while the grammar, query, file, content,
+    and persistent caches are shared and guarded by locks.
+    """
+
+    SUPPORTED_LANGUAGES: tuple[SupportedLanguage, ...] = (
         "python",
         "r",
         # "go",
@@ -257,58 +371,209 @@ class Extractor:
         # "typescript",
     )
 
-    _PYTHON_QUERY = """
-        (import_statement
-          name: (dotted_name) @import)
+    # Lower-cased file extensions handled by extract_from_file
+    _EXTENSION_LANGUAGES: ClassVar[dict[str, SupportedLanguage]] = {
+        ".py": "python",
+        ".r": "r",
+    }
+
+    def __init__(
+        self,
+        cache_path: str | Path | None = None,
+        prewarm: Iterable[SupportedLanguage] | None = None,
+        max_cached_langs: int = 8,
+        stdlibs: dict[str, frozenset[str]] | None = None,
+        max_file_bytes: int | None = None,
+    ) -> None:
+        """
+        Create an extractor.
+
+        Parameters
+        ----------
+        cache_path : str | Path | None
+            Optional path to a SQLite file used to persist raw extraction
+            results across runs, keyed by language and the SHA-256 of the
+            source. `eil.DEFAULT_CACHE_PATH` (`~/.cache/eil/ast.sqlite`) is the
+            conventional location. Caching is disabled when None (default).
+        prewarm : Iterable[SupportedLanguage] | None
+            Languages whose parser and query should be loaded immediately
+            (e.g. `Extractor.SUPPORTED_LANGUAGES`) instead of on the first
+            file of that language. Loading is lazy when None (default).
+        max_cached_langs : int
+            Maximum number of languages each thread keeps a parser and query
+            cursor for; the least recently used is evicted beyond it (default
+            8). Grammars and compiled queries are shared process-wide and are
+            not counted. Must be at least 1.
+        stdlibs : dict[str, frozenset[str]] | None
+            Pre-loaded standard library names per language. Defaults to the
+            packaged tables from `eil.data.load_stdlibs`.
+        max_file_bytes : int | None
+            Optional size limit. Files larger than this many bytes are refused
+            by `extract_from_file` with a `ValueError` (directory extraction
+            records them as failed) instead of being parsed, which keeps huge
+            generated or vendored files from dominating a scan. Peak memory is
+            driven by the parse tree, which is far larger than the source, so
+            this is the setting that bounds it. No limit when None (default).
+        """
+        if max_cached_langs < 1:
+            raise ValueError(f"max_cached_langs must be at least 1, got {max_cached_langs}")
+        self.max_cached_langs = max_cached_langs
+        self.max_file_bytes = max_file_bytes
+        self._local = threading.local()
+        # Guards the caches shared between threads; parsing happens outside it
+        self._lock = threading.Lock()
+        self.stdlibs = dict(stdlibs if stdlibs is not None else load_stdlibs())
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.cache = ImportCache(self.cache_path) if self.cache_path is not None else None
+        self._file_cache: OrderedDict[tuple[str, int, int], tuple[set[str], set[str]]] = (
+            OrderedDict()
+        )
+        self._content_cache: OrderedDict[tuple[str, bytes], tuple[set[str], set[str]]] = (
+            OrderedDict()
+        )
+
+        for lang in prewarm or ():
+            self._load_language(lang)
+
+    def close(self) -> None:
+        """Close the persistent cache's database connection, if one is open.
+
+        Extraction keeps working afterwards, without the persistent cache.
+        """
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def __enter__(self) -> Self:
+        """Return the extractor itself for use in a `with` block."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the persistent cache on leaving a `with` block."""
+        self.close()
+
+    def clear_cache(self) -> None:
+        """Drop the in-memory file and content caches.
+
+        The persistent on-disk cache (see `cache_path`) is left untouched.
+        """
+        with self._lock:
+            self._file_cache.clear()
+            self._content_cache.clear()
+
+    def _cache_get(self, cache: OrderedDict, key: tuple) -> tuple[set[str], set[str]] | None:
+        """Return a cached raw extraction and mark it most recently used."""
+        with self._lock:
+            raw = cache.get(key)
+            if raw is not None:
+                cache.move_to_end(key)
+            return raw
+
+    def _cache_put(
+        self,
+        cache: OrderedDict,
+        key: tuple,
+        raw: tuple[set[str], set[str]],
+        maxsize: int,
+    ) -> None:
+        """Store a raw extraction, evicting the least recently used beyond maxsize."""
+        with self._lock:
+            cache[key] = raw
+            _evict_lru(cache, maxsize)
+
+    def _thread_local_cache(self, name: str) -> OrderedDict:
+        """Return the calling thread's cache with the given name, creating it if needed."""
+        cache = getattr(self._local, name, None)
+        if cache is None:
+            cache = OrderedDict()
+            setattr(self._local, name, cache)
+        return cache
+
+    @property
+    def languages(self) -> MappingProxyType[str, Language]:
+        """Read-only view of the grammars loaded so far, keyed by language.
+
+        Grammars are shared process-wide, so every Extractor sees the same
+        entries, filled in as each language is first used.
+        """
+        return MappingProxyType(_LANG_CACHE)
+
+    @property
+    def queries(self) -> MappingProxyType[str, Query]:
+        """Read-only view of the compiled import queries, keyed by language.
 
-        (import_statement
-          name: (aliased_import
-            name: (dotted_name) @import))
+        Like `languages`, these are compiled once per process and shared by
+        every Extractor.
+        """
+        return MappingProxyType(_QUERY_CACHE)
 
-        (import_from_statement
-          module_name: (dotted_name) @import)
+    @property
+    def parsers(self) -> OrderedDict[SupportedLanguage, Parser]:
+        """Parsers owned by the calling thread, keyed by language.
 
-        (import_from_statement
-          module_name: (relative_import) @relative_import)
+        Parsers are not safe to share between threads, so each thread lazily
+        builds its own while languages and compiled queries are shared.
         """
+        return self._thread_local_cache("parsers")
+
+    @property
+    def cursors(self) -> OrderedDict[SupportedLanguage, QueryCursor]:
+        """Query cursors owned by the calling thread, keyed by language.
 
-    _R_QUERY = """
-        (call
-          function: (identifier) @func_name
-          arguments: (arguments
-            (argument [(identifier) (string)] @package)))
+        A cursor holds per-execution state, so like parsers they are kept per
+        thread and reused for every file that thread extracts.
+        """
+        return self._thread_local_cache("cursors")
 
-        (namespace_operator
-          lhs: (identifier) @package)
+    def _load_language(self, lang: SupportedLanguage) -> tuple[Parser, QueryCursor]:
+        """Return this thread's parser and query cursor for a language.
 
-        (namespace_operator
-          lhs: (string) @package)
+        Parsers and cursors are built on first use from the process-wide
+        grammar and compiled query, and kept in least-recently-used order,
+        evicting the oldest once more than `max_cached_langs` are held.
         """
+        # Fast path: files of one language are usually processed back to back.
+        # The only recency-ordered caches are this thread's own parsers and
+        # cursors, where the language it used last is already the most recent
+        # entry, so skipping the reordering cannot skew eviction. The entry is
+        # only trusted while those caches still hold it, so clearing or
+        # evicting from `parsers`/`cursors` always forces a rebuild.
+        last = getattr(self._local, "last", None)
+        if (
+            last is not None
+            and last[0] == lang
+            and self._local.parsers.get(lang) is last[1]
+            and self._local.cursors.get(lang) is last[2]
+        ):
+            return last[1], last[2]
+
+        parsers = self.parsers
+        cursors = self.cursors
+        parser = parsers.get(lang)
+        cursor = cursors.get(lang)
+        if parser is None or cursor is None:
+            language, query = _load_shared_language(lang)
+            parser = parsers[lang] = Parser(language)
+            cursor = cursors[lang] = QueryCursor(query)
+            _evict_lru(parsers, self.max_cached_langs)
+            _evict_lru(cursors, self.max_cached_langs)
+        else:
+            parsers.move_to_end(lang)
+            cursors.move_to_end(lang)
+
+        self._local.last = (lang, parser, cursor)
+        return parser, cursor
 
-    def __init__(self) -> None:
-        self.languages: dict[SupportedLanguage, Language] = {}
-        self.parsers: dict[SupportedLanguage, Parser] = {}
-        self.queries: dict[SupportedLanguage, Query] = {}
-        self.stdlibs = load_stdlibs()
-
-    def _load_language(self: Self, lang: SupportedLanguage) -> None:
-        """Load a language parser and query if not already loaded."""
-        if lang not in self.parsers:
-            self.languages[lang] = get_language(lang)
-            self.parsers[lang] = Parser(self.languages[lang])
-
-            # Cache the query for this language
-            query_map: dict[SupportedLanguage, str] = {
-                "python": self._PYTHON_QUERY,
-                "r": self._R_QUERY,
-            }
-            if lang in query_map:
-                self.queries[lang] = Query(self.languages[lang], query_map[lang])
+    def _parse_and_capture(self, lang: SupportedLanguage, source: bytes) -> dict[str, list]:
+        """Parse UTF-8 source and return the language query's captures by name."""
+        parser, cursor = self._load_language(lang)
+        tree = parser.parse(source)
+        return cursor.captures(tree.root_node)
 
     def _categorize_libraries(
-        self: Self,
+        self,
         deps: set[str],
-        stdlib_set: set[str],
+        stdlib_set: set[str] | frozenset[str],
         first_party: set[str] | None = None,
         stdlib_check_func: Callable[[str], bool] | None = None,
         repo_files: set[str] | None = None,
@@ -323,35 +588,21 @@ class Extractor:
         A language may be provided to apply language-specific package-name
         validation rules; invalid names are dropped from the resulting sets.
         """
-        stdlib: set[str] = set()
-        third_party: set[str] = set()
-        first_party_set = first_party or set()
-        repo_files_set = repo_files or set()
-        ignored_set = ignored_modules or set()
-
-        for dep in deps:
-            # Skip if this dependency lives in an ignored directory
-            if dep in ignored_set:
-                continue
+        first_party_set = set(first_party or ())
 
-            # Skip if already identified as first-party
-            if dep in first_party_set:
-                continue
+        # Drop vendored names and names already identified as first-party
+        remaining = deps - (ignored_modules or set()) - first_party_set
 
-            # First-party project files take precedence
-            if dep in repo_files_set:
-                first_party_set.add(dep)
-                continue
+        # First-party project files take precedence
+        repo_matches = remaining & (repo_files or set())
+        first_party_set |= repo_matches
+        remaining -= repo_matches
 
-            if stdlib_check_func:
-                if stdlib_check_func(dep):
-                    stdlib.add(dep)
-                else:
-                    third_party.add(dep)
-            elif dep in stdlib_set:
-                stdlib.add(dep)
-            else:
-                third_party.add(dep)
+        if stdlib_check_func is None:
+            stdlib = remaining & stdlib_set
+        else:
+            stdlib = {dep for dep in remaining if stdlib_check_func(dep)}
+        third_party = remaining - stdlib
 
         stdlib = _filter_names(stdlib, language, category="stdlib")
         third_party = _filter_names(third_party, language, category="third")
@@ -361,247 +612,428 @@ class Extractor:
             stdlib=stdlib, third_party=third_party, first_party=first_party_set
         )
 
-    def _python_absolute_imports(self, captures: dict, code: str) -> set[str]:
+    def _python_absolute_imports(self, captures: dict, source: bytes) -> set[str]:
         """Return top-level names from absolute import captures."""
-        libs: set[str] = set()
-        for node in captures.get("import", []):
-            parent = node.parent
-            if parent and parent.type == "relative_import":
-                continue
-            dep_name = code[node.start_byte : node.end_byte]
-            libs.add(dep_name.split(".")[0])
-        return libs
+        # The query's `module_name: (dotted_name)` field constraint never matches
+        # the dotted name nested inside a relative_import, so no filtering is needed
+        return {
+            _node_text(source, node).partition(".")[0] for node in captures.get("import", ())
+        }
 
-    def _python_extract_from_import_statement(self, import_statement, code: str) -> str | None:
+    def _python_extract_from_import_statement(
+        self, import_statement, source: bytes
+    ) -> str | None:
         """Check an import_from_statement and return the top-level module if present."""
         for child in import_statement.children:
             if child.type == "dotted_name":
-                return code[child.start_byte : child.end_byte].split(".")[0]
+                return _node_text(source, child).partition(".")[0]
             if child.type == "aliased_import":
                 for subchild in child.children:
                     if subchild.type == "dotted_name":
-                        return code[subchild.start_byte : subchild.end_byte].split(".")[0]
+                        return _node_text(source, subchild).partition(".")[0]
         return None
 
-    def _python_relative_dotted_name(self, node, code: str) -> str | None:
+    def _python_relative_dotted_name(self, node, source: bytes) -> str | None:
         """Return top-level name from a dotted_name child in a relative import node."""
         for child in node.children:
             if child.type == "dotted_name":
-                return code[child.start_byte : child.end_byte].split(".")[0]
+                return _node_text(source, child).partition(".")[0]
         return None
 
-    def _python_relative_imports(self, captures: dict, code: str) -> set[str]:
+    def _python_relative_module(self, node, source: bytes) -> str | None:
+        """Return the first-party module named by a relative import capture."""
+        import_statement = node.parent
+        if not import_statement or import_statement.type != "import_from_statement":
+            return None
+
+        dotted = self._python_relative_dotted_name(node, source)
+        if dotted:
+            return dotted
+
+        # Fallback: use helper to get the imported module from the import statement
+        return self._python_extract_from_import_statement(import_statement, source)
+
+    def _python_relative_imports(self, captures: dict, source: bytes) -> set[str]:
         """Return module names from relative import captures (first-party)."""
-        first_party: set[str] = set()
-        for node in captures.get("relative_import", []):
-            import_statement = node.parent
-            if not import_statement or import_statement.type != "import_from_statement":
-                continue
+        modules = (
+            self._python_relative_module(node, source)
+            for node in captures.get("relative_import", ())
+        )
+        return {module for module in modules if module}
 
-            dotted = self._python_relative_dotted_name(node, code)
-            if dotted:
-                first_party.add(dotted)
-                continue
+    def _python_raw_imports(self, source: bytes) -> tuple[set[str], set[str]]:
+        """Return (imported, first_party) names found in UTF-8 encoded Python source."""
+        captures = self._parse_and_capture("python", source)
 
-            # Fallback: use helper to get the imported module from the import statement
-            module = self._python_extract_from_import_statement(import_statement, code)
-            if module:
-                first_party.add(module)
-        return first_party
+        imported_libs = self._python_absolute_imports(captures, source)
+        first_party = self._python_relative_imports(captures, source)
+        return imported_libs, first_party
 
     def extract_python_libraries(
-        self: Self,
-        code: str,
+        self,
+        code: str | bytes,
         repo_files: set[str] | None = None,
         ignored_modules: set[str] | None = None,
     ) -> ImportedLibraries:
-        """Extract imported libraries from Python code."""
-        self._load_language("python")
-        tree = self.parsers["python"].parse(bytes(code, "utf8"))
-
-        query_cursor = QueryCursor(self.queries["python"])
-        captures = query_cursor.captures(tree.root_node)
-
-        imported_libs = self._python_absolute_imports(captures, code)
-        first_party = self._python_relative_imports(captures, code)
-
-        return self._categorize_libraries(
-            imported_libs,
-            self.stdlibs["python"],
-            first_party=first_party,
-            repo_files=repo_files,
-            ignored_modules=ignored_modules,
-            language="python",
-        )
+        """Extract imported libraries from Python code (str or UTF-8 encoded bytes)."""
+        raw = self._extract_raw("python", code)
+        return self._categorize_raw("python", raw, repo_files, ignored_modules)
 
-    def _r_select_package_node(self, candidate_pkgs: list, code: str):
-        """Select the best package node from candidates, avoiding named argument names."""
+    def _r_select_package_node(self, candidate_pkgs: list, source: bytes) -> int | None:
+        """Return the index of the best package candidate, avoiding named argument names."""
         # Prefer the first candidate that is not the name of a named argument
-        for pkg_node in candidate_pkgs:
+        for offset, pkg_node in enumerate(candidate_pkgs):
             pos = pkg_node.end_byte
-            while pos < len(code) and code[pos].isspace():
+            while pos < len(source) and source[pos : pos + 1].isspace():
                 pos += 1
-            if pos < len(code) and code[pos] == "=":
+            if source[pos : pos + 1] == b"=":
                 # This is the argument name (e.g., `package =` or `family =`),
                 # skip it in favor of the next candidate (likely the value).
                 continue
-            return pkg_node
+            return offset
 
         # If we didn't find a non-named-arg candidate, prefer a string literal
-        for pkg_node in candidate_pkgs:
-            text = code[pkg_node.start_byte : pkg_node.end_byte].strip()
-            if text.startswith('"') or text.startswith("'"):
-                return pkg_node
+        for offset, pkg_node in enumerate(candidate_pkgs):
+            text = _node_text(source, pkg_node).strip()
+            if text.startswith(('"', "'")):
+                return offset
 
         return None
 
-    def _r_process_calls(
-        self, captures: dict, code: str
-    ) -> tuple[set[str], set[str], set[tuple[int, int]]]:
-        """Process library/require/source calls and return imports and source positions."""
+    def _r_add_namespace_ops(
+        self,
+        imported_libs: set[str],
+        package_nodes_sorted: list,
+        start_idx: int,
+        end_idx: int,
+        source: bytes,
+        source_arg_indices: set[int],
+    ) -> None:
+        """Add packages named by :: and ::: operators among nodes [start_idx, end_idx)."""
+        # Only consider nodes that are the lhs of a namespace operator
+        pkg_texts = (
+            _unquoted_node_text(source, node)
+            for idx, node in enumerate(package_nodes_sorted[start_idx:end_idx], start_idx)
+            if idx not in source_arg_indices
+            and node.parent is not None
+            and node.parent.type == "namespace_operator"
+        )
+        imported_libs.update(t for t in pkg_texts if "/" not in t and not t.endswith(".R"))
+
+    def _r_raw_imports(self, source: bytes) -> tuple[set[str], set[str]]:
+        """Return (imported, first_party) names found in UTF-8 encoded R source.
+
+        Calls and package nodes are merged in a single forward walk: each
+        package node is either chosen as a call's argument or, once the walk
+        has moved past it, classified as a namespace operator.
+        """
+        captures = self._parse_and_capture("r", source)
+        func_nodes_sorted = sorted(captures.get("func_name", ()), key=lambda n: n.start_byte)
+        package_nodes_sorted = sorted(captures.get("package", ()), key=lambda n: n.start_byte)
+
         imported_libs: set[str] = set()
         first_party: set[str] = set()
-        source_arg_positions: set[tuple[int, int]] = set()
+        source_arg_indices: set[int] = set()
 
-        func_nodes = captures.get("func_name", [])
-        package_nodes = captures.get("package", [])
-        func_nodes_sorted = sorted(func_nodes, key=lambda n: n.start_byte)
-        package_nodes_sorted = sorted(package_nodes, key=lambda n: n.start_byte)
+        # Both lists are in document order, so a single forward-moving pointer
+        # into the package nodes finds each call's arguments in O(F + P), and
+        # every node before `pkg_idx` is final once the pointer passes it.
+        pkg_idx = 0
+        classified_idx = 0
 
         for func_node in func_nodes_sorted:
-            func_name = code[func_node.start_byte : func_node.end_byte]
-
-            # Only consider known import/source functions
-            if func_name not in ("library", "require", "source"):
-                continue
-
-            # Find the enclosing call node for this function
-            call_node = func_node.parent
-            while call_node and call_node.type != "call":
-                call_node = call_node.parent
+            # The query only captures library/require/source function names
+            call_node = _enclosing_call(func_node)
             if not call_node:
                 continue
 
-            # Collect package nodes that are part of the same call
-            candidate_pkgs = [
-                p
-                for p in package_nodes_sorted
-                if p.start_byte > func_node.start_byte and _is_descendant(p, call_node)
-            ]
-
-            if not candidate_pkgs:
-                continue
+            pkg_idx, end_idx = _sorted_nodes_between(
+                package_nodes_sorted, pkg_idx, func_node.start_byte, call_node.end_byte
+            )
+            self._r_add_namespace_ops(
+                imported_libs,
+                package_nodes_sorted,
+                classified_idx,
+                pkg_idx,
+                source,
+                source_arg_indices,
+            )
+            classified_idx = max(classified_idx, pkg_idx)
 
-            chosen_pkg = self._r_select_package_node(candidate_pkgs, code)
-            if not chosen_pkg:
+            candidate_pkgs = package_nodes_sorted[pkg_idx:end_idx]
+            chosen_offset = self._r_select_package_node(candidate_pkgs, source)
+            if chosen_offset is None:
                 continue
 
-            pkg_text = code[chosen_pkg.start_byte : chosen_pkg.end_byte].strip("\"'")
-
-            if func_name in ("library", "require"):
-                imported_libs.add(pkg_text)
-            elif func_name == "source":
-                source_arg_positions.add((chosen_pkg.start_byte, chosen_pkg.end_byte))
-                base_name = Path(pkg_text).stem
+            pkg_text = _unquoted_node_text(source, candidate_pkgs[chosen_offset])
+            if _node_text(source, func_node) == "source":
+                source_arg_indices.add(pkg_idx + chosen_offset)
+                base_name = _path_stem(pkg_text)
                 if base_name:
                     first_party.add(base_name)
-
-        return imported_libs, first_party, source_arg_positions
-
-    def _r_process_namespace_ops(
-        self, captures: dict, code: str, source_arg_positions: set[tuple[int, int]]
-    ) -> set[str]:
-        """Process :: and ::: namespace operators to extract package names."""
-        imported_libs: set[str] = set()
-        package_nodes = captures.get("package", [])
-        package_nodes_sorted = sorted(package_nodes, key=lambda n: n.start_byte)
-
-        for node in package_nodes_sorted:
-            # Only consider nodes that are part of a namespace operator (lhs of :: or :::)
-            if not node.parent or node.parent.type != "namespace_operator":
-                continue
-
-            if (node.start_byte, node.end_byte) in source_arg_positions:
-                continue
-
-            pkg_text = code[node.start_byte : node.end_byte].strip("\"'")
-            if "/" not in pkg_text and not pkg_text.endswith(".R"):
+            else:
                 imported_libs.add(pkg_text)
-        return imported_libs
-
-    def extract_r_libraries(
-        self: Self,
-        code: str,
-        repo_files: set[str] | None = None,
-        ignored_modules: set[str] | None = None,
-    ) -> ImportedLibraries:
-        """Extract imported libraries from R code."""
-        self._load_language("r")
-        tree = self.parsers["r"].parse(bytes(code, "utf8"))
-
-        query_cursor = QueryCursor(self.queries["r"])
-        captures = query_cursor.captures(tree.root_node)
 
-        imported_from_calls, first_party, source_arg_positions = self._r_process_calls(
-            captures, code
-        )
-        imported_from_namespace = self._r_process_namespace_ops(
-            captures, code, source_arg_positions
+        self._r_add_namespace_ops(
+            imported_libs,
+            package_nodes_sorted,
+            classified_idx,
+            len(package_nodes_sorted),
+            source,
+            source_arg_indices,
         )
+        return imported_libs, first_party
+
+    # Per-language functions turning UTF-8 source into raw (imported, first_party)
+    # names; everything around them (prefilter, caching, categorization) is shared
+    _RAW_EXTRACTORS: ClassVar[
+        dict[str, Callable[[Extractor, bytes], tuple[set[str], set[str]]]]
+    ] = {
+        "python": _python_raw_imports,
+        "r": _r_raw_imports,
+    }
 
-        imported_libs = imported_from_calls.union(imported_from_namespace)
-
+    def _extract_raw(self, lang: str, code: str | bytes) -> tuple[set[str], set[str]]:
+        """Return raw (imported, first_party) names, consulting the cache if enabled."""
+        # Encode once: tree-sitter works on UTF-8 bytes and reports byte offsets
+        source = code.encode("utf-8") if isinstance(code, str) else code
+
+        # Sources without any import-like token cannot produce captures, so
+        # skip parsing (and hashing) them entirely
+        if not any(token in source for token in _PREFILTER_TOKENS[lang]):
+            return set(), set()
+
+        # Identical content (e.g. a touched or re-checked-out file, or the same
+        # string passed twice) is served from memory without re-parsing
+        digest = hashlib.sha256(source).digest()
+        key = (lang, digest)
+        raw = self._cache_get(self._content_cache, key)
+        if raw is not None:
+            return raw
+
+        raw = self.cache.get(lang, digest) if self.cache is not None else None
+        if raw is None:
+            raw = self._RAW_EXTRACTORS[lang](self, source)
+            if self.cache is not None:
+                self.cache.put(lang, digest, *raw)
+
+        self._cache_put(self._content_cache, key, raw, _CONTENT_CACHE_MAXSIZE)
+        return raw
+
+    def _categorize_raw(
+        self,
+        lang: SupportedLanguage,
+        raw: tuple[set[str], set[str]],
+        repo_files: set[str] | None,
+        ignored_modules: set[str] | None,
+    ) -> ImportedLibraries:
+        """Categorize a raw (imported, first_party) extraction for a language."""
+        imported_libs, first_party = raw
         return self._categorize_libraries(
             imported_libs,
-            self.stdlibs["r"],
+            self.stdlibs[lang],
             first_party=first_party,
             repo_files=repo_files,
             ignored_modules=ignored_modules,
-            language="r",
+            language=lang,
         )
 
+    def extract_r_libraries(
+        self,
+        code: str | bytes,
+        repo_files: set[str] | None = None,
+        ignored_modules: set[str] | None = None,
+    ) -> ImportedLibraries:
+        """Extract imported libraries from R code (str or UTF-8 encoded bytes)."""
+        raw = self._extract_raw("r", code)
+        return self._categorize_raw("r", raw, repo_files, ignored_modules)
+
     def extract_from_file(
-        self: Self,
+        self,
         file_path: str | Path,
         repo_files: set[str] | None = None,
         ignored_modules: set[str] | None = None,
     ) -> ImportedLibraries:
         """Extract imported libraries from a file based on its extension."""
         path = Path(file_path)
-        if not path.exists():
-            raise FileNotFoundError(f"File not found: {file_path}")
 
-        # Parse
-        code = path.read_text(encoding="utf-8")
+        # A single stat serves the existence check, the size guards, and the
+        # memo key below
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}") from None
+
+        # Handle unsupported extension
+        lang = self._EXTENSION_LANGUAGES.get(path.suffix.lower())
+        if lang is None:
+            raise ValueError(
+                f"Unsupported file extension: {path.suffix}. "
+                f"Supported: {', '.join(sorted(self._EXTENSION_LANGUAGES))}"
+            )
 
-        # Map file extensions to extraction methods
-        ext_map = {
-            ".py": self.extract_python_libraries,
-            ".r": self.extract_r_libraries,
-            ".R": self.extract_r_libraries,
-        }
+        # Empty files (e.g. bare __init__.py) cannot import anything; skip the
+        # read entirely. Whitespace-only files are rejected by the prefilter.
+        if stat.st_size == 0:
+            return ImportedLibraries(stdlib=set(), third_party=set(), first_party=set())
+        if self.max_file_bytes is not None and stat.st_size > self.max_file_bytes:
+            raise ValueError(
+                f"File too large to extract: {file_path} is {stat.st_size} bytes "
+                f"(max_file_bytes={self.max_file_bytes})"
+            )
 
-        # Parse and return or handle unsupported extension
-        if path.suffix in ext_map:
-            return ext_map[path.suffix](
-                code,
-                repo_files=repo_files,
-                ignored_modules=ignored_modules,
+        # Reuse the raw extraction if the file is unchanged since it was last seen
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        raw = self._cache_get(self._file_cache, key)
+        if raw is None:
+            # Read raw bytes; tree-sitter parses UTF-8 directly so there is no
+            # need to decode the whole file only to re-encode it
+            raw = self._extract_raw(lang, path.read_bytes())
+            self._cache_put(self._file_cache, key, raw, _FILE_CACHE_MAXSIZE)
+
+        return self._categorize_raw(lang, raw, repo_files, ignored_modules)
+
+    def extract_from_files(
+        self,
+        paths: Iterable[str | Path],
+        max_workers: int | None = None,
+        repo_files: set[str] | None = None,
+        ignored_modules: set[str] | None = None,
+        processes: bool = True,
+        show_progress: bool = False,
+        progress_leave: bool = True,
+    ) -> DirectoryExtractionResult:
+        """
+        Extract imported libraries from many files in parallel.
+
+        Parameters
+        ----------
+        paths : Iterable[str | Path]
+            Source files to extract from.
+        max_workers : int | None
+            Maximum number of files extracted concurrently. Defaults to the
+            number of CPUs for processes, and to the number of CPUs capped at 8
+            for threads, so large trees do not open an unbounded number of
+            files at once.
+        repo_files : set[str] | None
+            Module names that should be classified as first-party.
+        ignored_modules : set[str] | None
+            Module names that should be dropped entirely.
+        processes : bool
+            Extract in worker processes, each with its own Extractor (default
+            True). When False, a thread pool shares this Extractor and its
+            caches instead, avoiding the per-process start-up cost.
+        show_progress : bool
+            Whether to display a progress bar (default False).
+        progress_leave : bool
+            Whether to leave the progress bar visible after completion (default True).
+
+        Returns
+        -------
+        DirectoryExtractionResult
+            Dataclass containing successfully extracted files and failed extractions
+            with their tracebacks, each keyed in the order of `paths`.
+        """
+        file_paths = [Path(p) for p in paths]
+        if processes:
+            outcomes = self._iter_extract_parallel(
+                file_paths, max_workers, repo_files, ignored_modules
+            )
+        else:
+            outcomes = self._iter_extract_threaded(
+                file_paths, max_workers, repo_files, ignored_modules
             )
 
-        supported_exts = ", ".join(sorted(set(ext_map.keys())))
-        raise ValueError(
-            f"Unsupported file extension: {path.suffix}. Supported: {supported_exts}"
-        )
+        result = DirectoryExtractionResult()
+        with tqdm(
+            total=len(file_paths),
+            desc="Extracting imports",
+            leave=progress_leave,
+            disable=not show_progress,
+        ) as progress_bar:
+            for path, libs, error in outcomes:
+                _record_extraction(result, path, libs, error)
+                progress_bar.update()
+        return result
+
+    def _iter_extract_threaded(
+        self,
+        file_paths: list[Path],
+        max_workers: int | None,
+        repo_files: set[str] | None,
+        ignored_modules: set[str] | None,
+    ) -> Iterator[tuple[Path, ImportedLibraries | None, str | None]]:
+        """Yield (path, libraries, traceback) from a bounded pool of threads."""
+        if max_workers is None:
+            max_workers = min(8, os.cpu_count() or 1)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from executor.map(
+                lambda path: self._extract_with_traceback(path, repo_files, ignored_modules),
+                file_paths,
+            )
+
+    def _extract_with_traceback(
+        self,
+        path: Path,
+        repo_files: set[str] | None,
+        ignored_modules: set[str] | None,
+    ) -> tuple[Path, ImportedLibraries | None, str | None]:
+        """Extract a single file, capturing any traceback instead of raising."""
+        try:
+            libs = self.extract_from_file(
+                path, repo_files=repo_files, ignored_modules=ignored_modules
+            )
+        except Exception:
+            return path, None, traceback.format_exc()
+        return path, libs, None
+
+    def _iter_extract_parallel(
+        self,
+        file_paths: list[Path],
+        max_workers: int | None,
+        repo_files: set[str] | None,
+        ignored_modules: set[str] | None,
+    ) -> Iterator[tuple[Path, ImportedLibraries | None, str | None]]:
+        """Yield (path, libraries, traceback) from worker processes in input order."""
+        if not file_paths:
+            return
+
+        # Publish the stdlib tables once in shared memory so workers attach to
+        # a single copy instead of each loading and merging them from scratch
+        stdlibs_blob = _serialize_stdlibs(self.stdlibs)
+        shm = SharedMemory(create=True, size=len(stdlibs_blob))
+        try:
+            shm.buf[: len(stdlibs_blob)] = stdlibs_blob
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=_pool_context(),
+                initializer=_init_worker,
+                initargs=(
+                    shm.name,
+                    len(stdlibs_blob),
+                    # A closed extractor's workers must not reopen its cache
+                    self.cache_path if self.cache is not None else None,
+                    self.max_file_bytes,
+                    repo_files,
+                    ignored_modules,
+                ),
+            ) as executor:
+                yield from executor.map(_extract_one, file_paths)
+        finally:
+            shm.close()
+            shm.unlink()
 
     def extract_from_directory(
-        self: Self,
+        self,
         directory: str | Path,
         extractor_type: ExtractorType = ExtractorType.ALL,
         recursive: bool = False,
         show_progress: bool = True,
         progress_leave: bool = True,
         ignore_directories_list: set[str] | None = None,
+        max_workers: int | None = 1,
+        processes: bool = True,
     ) -> DirectoryExtractionResult:
         """
         Extract imported libraries from all source files in a directory.
@@ -624,6 +1056,14 @@ class Extractor:
             Directory names to ignore when classifying first-party modules. If
             None, a default set of common names (e.g., 'external', 'vendor')
             will be used.
+        max_workers : int | None
+            Number of workers to extract with (default 1, extracts one file at a
+            time in the calling thread). Any other value, including None for
+            the default pool size, hands the files to `extract_from_files`.
+        processes : bool
+            Whether those workers are processes (default True) or threads
+            sharing this Extractor; see `extract_from_files`. Ignored when
+            `max_workers` is 1.
 
         Returns
         -------
@@ -655,18 +1095,30 @@ class Extractor:
         if not files_to_extract:
             return result
 
+        # Collect module names that live in ignored directories so we can exclude
+        # imports that reference vendored code entirely.
+        ignored_modules = _collect_ignored_modules(directory, recursive, ignore_set)
+
+        file_paths = [file_path for file_path, _file_type in files_to_extract]
+        if max_workers != 1:
+            return self.extract_from_files(
+                file_paths,
+                max_workers=max_workers,
+                repo_files=repo_files,
+                ignored_modules=ignored_modules,
+                processes=processes,
+                show_progress=show_progress,
+                progress_leave=progress_leave,
+            )
+
         progress_bar = tqdm(
-            files_to_extract,
+            total=len(file_paths),
             desc="Extracting imports",
             leave=progress_leave,
             disable=not show_progress,
         )
 
-        # Collect module names that live in ignored directories so we can exclude
-        # imports that reference vendored code entirely.
-        ignored_modules = _collect_ignored_modules(directory, recursive, ignore_set)
-
-        for file_path, _file_type in progress_bar:
+        for file_path in file_paths:
             progress_bar.set_description(f"Extracting {file_path.name}")
             try:
                 result.extracted[file_path] = self.extract_from_file(
@@ -676,5 +1128,74 @@ class Extractor:
                 )
             except Exception:
                 result.failed[file_path] = traceback.format_exc()
+            progress_bar.update()
 
+        progress_bar.close()
         return result
+
+
+###############################################################################
+
+_WORKER_EXTRACTOR: Extractor | None = None
+_WORKER_REPO_FILES: set[str] | None = None
+_WORKER_IGNORED_MODULES: set[str] | None = None
+
+
+def _serialize_stdlibs(stdlibs: dict[str, frozenset[str]]) -> bytes:
+    """Encode stdlib tables into a single contiguous blob."""
+    return json.dumps({lang: sorted(names) for lang, names in stdlibs.items()}).encode()
+
+
+def _deserialize_stdlibs(blob: bytes) -> dict[str, frozenset[str]]:
+    """Decode stdlib tables produced by `_serialize_stdlibs`."""
+    return {lang: frozenset(names) for lang, names in json.loads(blob).items()}
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """Return a start method that is safe from a multi-threaded parent.
+
+    Extractors are used from threads (`extract_from_files(processes=False)`,
+    tqdm's monitor), and forking such a process can deadlock a child on a lock
+    held by another thread, so workers are started with forkserver where the
+    platform has it and spawn otherwise.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(
+    stdlibs_shm_name: str,
+    stdlibs_size: int,
+    cache_path: Path | None,
+    max_file_bytes: int | None,
+    repo_files: set[str] | None,
+    ignored_modules: set[str] | None,
+) -> None:
+    """Build a process-local Extractor once per worker process."""
+    global _WORKER_EXTRACTOR, _WORKER_REPO_FILES, _WORKER_IGNORED_MODULES
+    shm = SharedMemory(name=stdlibs_shm_name)
+    try:
+        stdlibs = _deserialize_stdlibs(bytes(shm.buf[:stdlibs_size]))
+    finally:
+        shm.close()
+
+    _WORKER_EXTRACTOR = Extractor(
+        cache_path=cache_path,
+        prewarm=Extractor.SUPPORTED_LANGUAGES,
+        stdlibs=stdlibs,
+        max_file_bytes=max_file_bytes,
+    )
+    # Workers exit without running atexit hooks; multiprocessing finalizers
+    # with an exit priority do run, so use one to close the worker's cache
+    Finalize(None, _WORKER_EXTRACTOR.close, exitpriority=10)
+    _WORKER_REPO_FILES = repo_files
+    _WORKER_IGNORED_MODULES = ignored_modules
+
+
+def _extract_one(path: Path) -> tuple[Path, ImportedLibraries | None, str | None]:
+    """Extract a single file in a worker process, capturing any traceback."""
+    assert _WORKER_EXTRACTOR is not None
+    return _WORKER_EXTRACTOR._extract_with_traceback(
+        path, _WORKER_REPO_FILES, _WORKER_IGNORED_MODULES
+    )
@@ -0,0 +1,12 @@
+"""Tree-sitter import queries for each supported language."""
+
+from pathlib import Path
+
+QUERIES_DIR = Path(__file__).parent
+
+###############################################################################
+
+
+def load_query_source(lang: str) -> str:
+    """Load the import query for a language from its packaged `.scm` file."""
+    return (QUERIES_DIR / f"{lang}.scm").read_text(encoding="utf-8")
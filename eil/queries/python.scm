@@ -0,0 +1,14 @@
+; Absolute imports: `import a.b`, `import a.b as c`, `from a.b import c`
+(import_statement
+  name: (dotted_name) @import)
+
+(import_statement
+  name: (aliased_import
+    name: (dotted_name) @import))
+
+(import_from_statement
+  module_name: (dotted_name) @import)
+
+; Relative imports: `from . import a`, `from .a import b`
+(import_from_statement
+  module_name: (relative_import) @relative_import)
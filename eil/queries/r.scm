@@ -0,0 +1,13 @@
+; Arguments of library(), require(), and source() calls
+((call
+  function: (identifier) @func_name
+  arguments: (arguments
+    (argument [(identifier) (string)] @package)))
+ (#any-of? @func_name "library" "require" "source"))
+
+; Package side of `pkg::fn` and `pkg:::fn`
+(namespace_operator
+  lhs: (identifier) @package)
+
+(namespace_operator
+  lhs: (string) @package)
@@ -1,11 +1,16 @@
 #!/usr/bin/env python
 
+import hashlib
+import os
+import threading
 from collections.abc import Callable
 from pathlib import Path
 
 import pytest
 
-from eil import Extractor, ExtractorType, ImportedLibraries
+from eil import DEFAULT_CACHE_PATH, Extractor, ExtractorType, ImportedLibraries
+from eil.data import load_stdlibs
+from eil.main import _load_shared_language
 
 ###############################################################################
 
@@ -81,12 +86,19 @@ def test_library_extraction_from_file() -> None:
     # Check stdlib
     assert extracted_libs.stdlib == {
         "collections",
+        "concurrent",
         "dataclasses",
         "enum",
+        "hashlib",
+        "os",
+        "json",
+        "multiprocessing",
         "pathlib",
         "traceback",
+        "types",
         "typing",
         "re",
+        "threading",
     }
 
     # Check third_party
@@ -96,8 +108,8 @@ def test_library_extraction_from_file() -> None:
         "tree_sitter_language_pack",
     }
 
-    # Check first_party (data module)
-    assert extracted_libs.first_party == {"data"}
+    # Check first_party (cache and data modules)
+    assert extracted_libs.first_party == {"_cache", "data", "queries"}
 
 
 def test_directory_extraction() -> None:
@@ -422,3 +434,490 @@ def test_ignore_external_dir_r(tmp_path: Path) -> None:
     )
     libs2 = result2.extracted[script]
     assert "localpkg" in libs2.first_party
+
+
+def test_query_compiled_once_per_language() -> None:
+    """The parser and cursor should be reused across extraction calls."""
+    extractor = Extractor()
+    extractor.extract_python_libraries("import os\n")
+    parser = extractor.parsers["python"]
+    cursor = extractor.cursors["python"]
+    libs = extractor.extract_python_libraries("import sys\n")
+    assert extractor.parsers["python"] is parser
+    assert extractor.cursors["python"] is cursor
+    assert libs.stdlib == {"sys"}
+
+
+def test_persistent_cache_roundtrip(tmp_path: Path) -> None:
+    """Cached raw extractions should be reused across extractor instances."""
+    cache_path = tmp_path / "cache" / "ast.sqlite"
+    code = "import os\nimport numpy\nfrom .utils import helper\n"
+
+    with Extractor(cache_path=cache_path) as first_extractor:
+        first = first_extractor.extract_python_libraries(code)
+    assert cache_path.exists()
+    assert first_extractor.cache is None
+
+    with Extractor(cache_path=cache_path) as second_extractor:
+        assert second_extractor.cache is not None
+        digest = hashlib.sha256(code.encode("utf-8")).digest()
+        assert second_extractor.cache.get("python", digest) == (
+            {"os", "numpy"},
+            {"utils"},
+        )
+
+        second = second_extractor.extract_python_libraries(code)
+        assert second == first
+        # Nothing should have been parsed on the cache hit
+        assert "python" not in second_extractor.parsers
+
+    # Closed extractors keep working without the persistent cache
+    assert second_extractor.extract_python_libraries(code) == first
+    second_extractor.close()
+
+
+def test_extract_from_files_parallel(tmp_path: Path) -> None:
+    """Parallel extraction should match sequential extraction and capture failures."""
+    (tmp_path / "utils.py").write_text("import json\n")
+    app = tmp_path / "app.py"
+    app.write_text("import utils\nimport requests\n")
+    script = tmp_path / "script.R"
+    script.write_text("library(ggplot2)\n")
+    missing = tmp_path / "missing.py"
+
+    extractor = Extractor()
+    result = extractor.extract_from_files(
+        [app, script, missing],
+        max_workers=2,
+        repo_files={"utils"},
+    )
+
+    assert result.extracted[app] == extractor.extract_from_file(app, repo_files={"utils"})
+    assert result.extracted[script].third_party == {"ggplot2"}
+    assert missing in result.failed
+    assert "FileNotFoundError" in result.failed[missing]
+
+
+def test_parsers_are_thread_local() -> None:
+    """Each thread should get its own parser while sharing compiled queries."""
+    extractor = Extractor()
+    extractor.extract_python_libraries("import os\n")
+    main_parser = extractor.parsers["python"]
+
+    results: list = []
+
+    def _worker() -> None:
+        libs = extractor.extract_python_libraries("import numpy\n")
+        results.append((extractor.parsers["python"], libs))
+
+    thread = threading.Thread(target=_worker)
+    thread.start()
+    thread.join()
+
+    (thread_parser, libs) = results[0]
+    assert thread_parser is not main_parser
+    assert libs.third_party == {"numpy"}
+
+
+def test_non_ascii_source_offsets() -> None:
+    """Byte offsets must be applied to the encoded source, not the decoded string."""
+    extractor = Extractor()
+    py_libs = extractor.extract_python_libraries(
+        '"""Überprüfung — ✓"""\nimport numpy\nimport os\n'
+    )
+    assert py_libs.third_party == {"numpy"}
+    assert py_libs.stdlib == {"os"}
+
+    r_libs = extractor.extract_r_libraries(
+        "# Größe ✓\nlibrary(ggplot2)\nx <- dplyr::filter(df)\n"
+    )
+    assert r_libs.third_party == {"ggplot2", "dplyr"}
+
+
+def test_r_many_calls_paired_with_own_arguments() -> None:
+    """Each library/source call should only consider its own arguments."""
+    extractor = Extractor()
+    script = """
+library(ggplot2)
+x <- mean(c(1, 2))
+require(dplyr, quietly = TRUE)
+source(file.path("helpers", "utils.R"))
+library(package = "tidyr", character.only = TRUE)
+y <- readr::read_csv("data.csv")
+"""
+    libs = extractor.extract_r_libraries(script)
+    assert libs.third_party == {"ggplot2", "dplyr", "tidyr", "readr"}
+    assert "quietly" not in libs.third_party
+
+
+def test_stdlibs_loaded_once_and_frozen() -> None:
+    """Stdlib tables should be shared across extractors and immutable."""
+    first = Extractor()
+    second = Extractor()
+    assert isinstance(first.stdlibs["python"], frozenset)
+    assert first.stdlibs["python"] is second.stdlibs["python"]
+
+    # The shared table itself cannot be modified by callers
+    with pytest.raises(TypeError):
+        load_stdlibs()["python"] = frozenset()  # type: ignore[index]
+    assert load_stdlibs()["python"] is first.stdlibs["python"]
+
+
+def test_prewarm_loads_languages() -> None:
+    """Prewarmed languages should have parsers and queries ready before use."""
+    extractor = Extractor(prewarm=Extractor.SUPPORTED_LANGUAGES)
+    for lang in Extractor.SUPPORTED_LANGUAGES:
+        assert lang in extractor.parsers
+        assert lang in extractor.cursors
+
+
+def test_prefilter_skips_sources_without_imports() -> None:
+    """Sources with no import-like tokens should not be parsed at all."""
+    extractor = Extractor()
+    libs = extractor.extract_python_libraries("x = 1\nprint(x)\n")
+    assert libs == ImportedLibraries(stdlib=set(), third_party=set(), first_party=set())
+    assert "python" not in extractor.parsers
+
+    libs = extractor.extract_r_libraries("x <- c(1, 2)\nmean(x)\n")
+    assert libs == ImportedLibraries(stdlib=set(), third_party=set(), first_party=set())
+    assert "r" not in extractor.parsers
+
+
+def test_extract_from_bytes_and_file_match(tmp_path: Path) -> None:
+    """Bytes input and file extraction should agree with str input."""
+    extractor = Extractor()
+    code = "# café\nimport os\nimport numpy\n"
+    script = tmp_path / "script.py"
+    script.write_bytes(code.encode("utf-8"))
+
+    expected = extractor.extract_python_libraries(code)
+    assert extractor.extract_python_libraries(code.encode("utf-8")) == expected
+    assert extractor.extract_from_file(script) == expected
+
+
+def test_language_cache_is_bounded() -> None:
+    """Parsers and cursors beyond max_cached_langs should be evicted LRU-first."""
+    extractor = Extractor(max_cached_langs=1)
+    extractor.extract_python_libraries("import os\n")
+    extractor.extract_r_libraries("library(ggplot2)\n")
+    assert list(extractor.parsers) == ["r"]
+    assert list(extractor.cursors) == ["r"]
+
+    # Evicted languages are transparently reloaded
+    libs = extractor.extract_python_libraries("import numpy\n")
+    assert libs.third_party == {"numpy"}
+    assert list(extractor.parsers) == ["python"]
+    assert list(extractor.cursors) == ["python"]
+
+    for invalid in (0, -1):
+        with pytest.raises(ValueError, match="max_cached_langs"):
+            Extractor(max_cached_langs=invalid)
+
+
+def test_categorize_libraries_precedence() -> None:
+    """Ignored names are dropped and repo files win over stdlib/third-party."""
+    extractor = Extractor()
+    first_party = {"helpers"}
+    res = extractor._categorize_libraries(
+        deps={"os", "json", "numpy", "vendored", "helpers"},
+        stdlib_set=extractor.stdlibs["python"],
+        first_party=first_party,
+        repo_files={"json"},
+        ignored_modules={"vendored"},
+    )
+    assert res.stdlib == {"os"}
+    assert res.third_party == {"numpy"}
+    assert res.first_party == {"helpers", "json"}
+    # The caller's set must not be mutated
+    assert first_party == {"helpers"}
+
+    res = extractor._categorize_libraries(
+        deps={"os", "numpy"},
+        stdlib_set=frozenset(),
+        stdlib_check_func=lambda name: name == "numpy",
+    )
+    assert res.stdlib == {"numpy"}
+    assert res.third_party == {"os"}
+
+
+def test_extract_from_file_memoized_by_stat(tmp_path: Path) -> None:
+    """Unchanged files should be served from memory; modified files re-extracted."""
+    extractor = Extractor()
+    script = tmp_path / "app.py"
+    script.write_text("import numpy\n")
+
+    assert extractor.extract_from_file(script).third_party == {"numpy"}
+    assert len(extractor._file_cache) == 1
+
+    # Repo files still apply to memoized results
+    libs = extractor.extract_from_file(script, repo_files={"numpy"})
+    assert libs.first_party == {"numpy"}
+    assert len(extractor._file_cache) == 1
+
+    script.write_text("import pandas, requests\n")
+    os.utime(script, ns=(0, 0))
+    assert extractor.extract_from_file(script).third_party == {"pandas", "requests"}
+
+    extractor.clear_cache()
+    assert len(extractor._file_cache) == 0
+    assert extractor.extract_from_file(script).third_party == {"pandas", "requests"}
+
+
+def test_extract_from_files_uses_provided_stdlibs(tmp_path: Path) -> None:
+    """Workers should classify with the parent's stdlib tables."""
+    app = tmp_path / "app.py"
+    app.write_text("import numpy\nimport os\n")
+
+    stdlibs = dict(Extractor().stdlibs)
+    stdlibs["python"] = frozenset({"numpy"})
+    extractor = Extractor(stdlibs=stdlibs)
+
+    result = extractor.extract_from_files([app], max_workers=1)
+    assert result.extracted[app].stdlib == {"numpy"}
+    assert result.extracted[app].third_party == {"os"}
+
+
+def test_identical_content_not_reparsed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Files whose content is unchanged should reuse the in-memory extraction."""
+    extractor = Extractor()
+    calls = []
+    parse_and_capture = extractor._parse_and_capture
+
+    def counting_parse_and_capture(lang: str, source: bytes) -> dict[str, list]:
+        calls.append(lang)
+        return parse_and_capture(lang, source)
+
+    monkeypatch.setattr(extractor, "_parse_and_capture", counting_parse_and_capture)
+    script = tmp_path / "app.py"
+    script.write_text("import numpy\n")
+    first = extractor.extract_from_file(script)
+    assert calls == ["python"]
+
+    # Touch the file so the stat-based memo misses but the content is identical
+    os.utime(script, ns=(0, 0))
+    assert extractor.extract_from_file(script) == first
+    assert calls == ["python"]
+
+
+def test_cleared_parsers_are_rebuilt() -> None:
+    """Clearing the thread's parsers should drop the cached parser for real."""
+    extractor = Extractor()
+    extractor.extract_python_libraries("import numpy\n")
+    parser = extractor.parsers["python"]
+
+    extractor.parsers.clear()
+    extractor.cursors.clear()
+    assert extractor.extract_python_libraries("import pandas\n").third_party == {"pandas"}
+    assert extractor.parsers["python"] is not parser
+
+
+def test_r_source_argument_not_double_counted() -> None:
+    """A namespace operator consumed as a source() argument is not also an import."""
+    extractor = Extractor()
+    libs = extractor.extract_r_libraries(
+        'source(file = "main.R")\nsource(local = TRUE, utils::head)\nlibrary(dplyr)\n'
+    )
+    assert libs.third_party == {"dplyr"}
+    assert libs.first_party == {"main", "utils"}
+
+
+def test_compiled_queries_shared_across_extractors() -> None:
+    """Separate extractors should reuse the same grammar and compiled query."""
+    first = Extractor(prewarm=["python"])
+    second = Extractor(prewarm=["python"])
+    assert _load_shared_language("python")[1] is _load_shared_language("python")[1]
+    assert first.parsers["python"].language is second.parsers["python"].language
+    assert first.parsers["python"] is not second.parsers["python"]
+    assert first.queries["python"] is second.queries["python"]
+    assert first.languages["python"] is second.languages["python"]
+    with pytest.raises(TypeError):
+        first.queries["python"] = None  # type: ignore[index]
+
+
+def test_directory_extraction_parallel_matches_sequential(tmp_path: Path) -> None:
+    """Parallel directory extraction should produce the same results."""
+    (tmp_path / "utils.py").write_text("import json\n")
+    (tmp_path / "app.py").write_text("import utils\nimport requests\n")
+    (tmp_path / "script.R").write_text("library(ggplot2)\n")
+
+    extractor = Extractor()
+    sequential = extractor.extract_from_directory(tmp_path, show_progress=False)
+    for processes in (True, False):
+        parallel = extractor.extract_from_directory(
+            tmp_path, show_progress=False, max_workers=2, processes=processes
+        )
+        assert parallel.extracted == sequential.extracted
+        assert list(parallel.extracted) == list(sequential.extracted)
+        assert parallel.failed == sequential.failed == {}
+
+
+def test_extract_from_files_keeps_input_order(tmp_path: Path) -> None:
+    """Batch results should be keyed in input order whichever file finishes first."""
+    paths = []
+    for i in range(12):
+        path = tmp_path / f"mod{i}.py"
+        # Vary the amount of work so workers finish out of order
+        path.write_text("import json\n" * (1 + (11 - i) * 200))
+        paths.append(path)
+
+    extractor = Extractor()
+    for processes in (True, False):
+        result = extractor.extract_from_files(paths, max_workers=4, processes=processes)
+        assert list(result.extracted) == paths
+
+
+def test_empty_and_whitespace_files(tmp_path: Path) -> None:
+    """Empty and whitespace-only files should extract to nothing."""
+    extractor = Extractor()
+    for name, content in [("empty.py", ""), ("blank.py", "  \n\n\t\n"), ("blank.R", "\n")]:
+        path = tmp_path / name
+        path.write_text(content)
+        result = extractor.extract_from_file(path)
+        assert result.stdlib == result.third_party == result.first_party == set()
+
+
+def test_max_file_bytes_guard(tmp_path: Path) -> None:
+    """Files above an opt-in size limit should be refused and reported as failures."""
+    big = tmp_path / "big.py"
+    big.write_text("import json\n" + "x = 1\n" * 100)
+    small = tmp_path / "small.py"
+    small.write_text("import os\n")
+
+    extractor = Extractor(max_file_bytes=64)
+    with pytest.raises(ValueError, match="too large"):
+        extractor.extract_from_file(big)
+
+    result = extractor.extract_from_directory(tmp_path, show_progress=False)
+    assert set(result.extracted) == {small}
+    assert set(result.failed) == {big}
+
+    # No limit unless one is requested
+    assert Extractor().extract_from_file(big).stdlib == {"json"}
+
+
+def test_load_language_fast_path_tracks_language_switches() -> None:
+    """Repeated loads reuse objects, and switching languages returns the right pair."""
+    extractor = Extractor()
+    py_parser, py_cursor = extractor._load_language("python")
+    assert extractor._load_language("python") == (py_parser, py_cursor)
+
+    r_parser, _ = extractor._load_language("r")
+    assert r_parser is not py_parser
+    assert extractor._load_language("python")[0] is py_parser
+    assert extractor.extract_r_libraries("library(dplyr)").third_party == {"dplyr"}
+
+    # Fast-path hits leave the most recently used language last in LRU order
+    extractor._load_language("r")
+    extractor._load_language("python")
+    extractor._load_language("python")
+    assert list(extractor.parsers) == list(extractor.cursors) == ["r", "python"]
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("main.R", "main"),
+        ("R/helpers.R", "helpers"),
+        ("../up.r", "up"),
+        ("archive.tar.gz", "archive.tar"),
+        ("dir/", "dir"),
+        ("foo/.", "foo"),
+    ],
+)
+def test_r_source_file_stem(path: str, expected: str) -> None:
+    """source() arguments should be reduced to the file stem as first-party."""
+    libs = Extractor().extract_r_libraries(f'source("{path}")')
+    assert libs.first_party == {expected}
+
+
+def test_extractor_shared_between_threads(tmp_path: Path) -> None:
+    """Concurrent extraction through one Extractor should match serial results."""
+    paths = []
+    for i in range(40):
+        path = tmp_path / f"mod_{i}.py"
+        path.write_text(f"import os\nimport pkg_{i % 7}\n")
+        paths.append(path)
+
+    extractor = Extractor(cache_path=tmp_path / "cache.sqlite")
+    results: dict[Path, ImportedLibraries] = {}
+
+    def _worker(chunk: list[Path]) -> None:
+        for path in chunk:
+            results[path] = extractor.extract_from_file(path)
+
+    threads = [threading.Thread(target=_worker, args=(paths[i::4],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    extractor.close()
+
+    serial = Extractor()
+    assert results == {path: serial.extract_from_file(path) for path in paths}
+
+
+def test_extract_from_files_threaded(tmp_path: Path) -> None:
+    """Threaded batch extraction should match per-file results and record failures."""
+    app = tmp_path / "app.py"
+    app.write_text("import json\nimport requests\n")
+    script = tmp_path / "script.R"
+    script.write_text("library(dplyr)\n")
+    missing = tmp_path / "missing.py"
+
+    extractor = Extractor()
+    result = extractor.extract_from_files(
+        [app, str(script), missing], max_workers=2, processes=False
+    )
+    assert result.extracted == {
+        app: extractor.extract_from_file(app),
+        script: extractor.extract_from_file(script),
+    }
+    assert set(result.failed) == {missing}
+    assert "FileNotFoundError" in result.failed[missing]
+
+
+def test_extract_from_file_extension_handling(tmp_path: Path) -> None:
+    """Extensions are matched case-insensitively and unknown ones are rejected."""
+    extractor = Extractor()
+    upper = tmp_path / "SCRIPT.PY"
+    upper.write_text("import numpy\n")
+    assert extractor.extract_from_file(upper).third_party == {"numpy"}
+
+    unknown = tmp_path / "notes.txt"
+    unknown.write_text("import numpy\n")
+    with pytest.raises(
+        ValueError, match=r"Unsupported file extension: \.txt\. Supported: \.py, \.r$"
+    ):
+        extractor.extract_from_file(unknown)
+
+
+def test_default_cache_path_expanded_lazily(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The default cache path is only resolved against HOME when a cache opens."""
+    assert str(DEFAULT_CACHE_PATH).startswith("~")
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    with Extractor(cache_path=DEFAULT_CACHE_PATH) as extractor:
+        assert extractor.cache is not None
+        assert extractor.cache.path == tmp_path / ".cache" / "eil" / "ast.sqlite"
+        extractor.extract_python_libraries("import os\n")
+    assert (tmp_path / ".cache" / "eil" / "ast.sqlite").exists()
+
+
+def test_closed_extractor_workers_skip_cache(tmp_path: Path) -> None:
+    """Worker processes of a closed extractor should not reopen its cache."""
+    cache_path = tmp_path / "cache.sqlite"
+    app = tmp_path / "app.py"
+    app.write_text("import numpy\n")
+
+    extractor = Extractor(cache_path=cache_path)
+    extractor.close()
+    cache_path.unlink()
+
+    result = extractor.extract_from_files([app], max_workers=1)
+    assert result.extracted[app].third_party == {"numpy"}
+    assert not cache_path.exists()